@@ -0,0 +1,235 @@
+from clicdata_api_wrapper.account import Account
+from datetime import datetime
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+import pandas as pd
+import glob
+import json
+import os
+
+
+class ActivityStore:
+    """
+    Class ActivityStore keeps an append-only local copy of account activity,
+    partitioned by day in parquet files, so polling only pulls new records
+
+    Class Methods:
+    update()
+        Merge activity newer than the stored high-water mark into the store
+    query()
+        Read stored activity within a time range without calling the API
+    """
+    def __init__(
+        self,
+        path=None,
+        entity='users',
+        time_column=None,
+        **connection_params
+    ):
+        """
+        Parameters
+        path : str
+            Local directory the store is kept in
+        entity : str
+            Activity data to store, 'dashboards' vs 'users'
+        time_column : str
+            Column holding the activity timestamp, detected from the column names if not provided
+        """
+        valid_entities = ['users', 'dashboards']
+        if path is None:
+            raise Exception("Please enter a valid path for your activity store.")
+        if entity not in valid_entities:
+            raise Exception("Please enter a valid entity: "+str(valid_entities))
+
+        self.account = Account(**connection_params)
+        self.entity = entity
+        self.path = os.path.join(path, entity)
+        self._meta_path = os.path.join(self.path, "_meta.json")
+        self.time_column = time_column
+        self.high_water_mark = None
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r") as fh:
+                meta = json.load(fh)
+            self.time_column = self.time_column or meta.get("time_column")
+        if self.time_column is not None:
+            self.high_water_mark = self._stored_high_water_mark()
+
+    ###
+    # Methods
+    ###
+    def _resolve_time_column(self, activity):
+        """Find the timestamp column, defaulting to the first column named like a date or time"""
+        if self.time_column is None:
+            for column in activity.columns:
+                if 'date' in column.lower() or 'time' in column.lower():
+                    self.time_column = column
+                    break
+        if self.time_column not in activity.columns:
+            raise Exception("Please enter a valid time_column from: "+str(list(activity.columns)))
+        return self.time_column
+
+    def _stored_high_water_mark(self):
+        """Read the latest stored timestamp from the newest day partition
+        Taken from the partitions themselves so an update interrupted before
+        finishing can never leave a stale mark behind
+        """
+        for partition in sorted(glob.glob(os.path.join(self.path, "date=*")), reverse=True):
+            files = glob.glob(os.path.join(partition, "part-*.parquet"))
+            if files:
+                times = pd.concat([pd.read_parquet(f, columns=[self.time_column])[self.time_column]
+                                   for f in files])
+                return times.max()
+        return None
+
+    def _write_meta(self):
+        """Persist the time column so later sessions read the store the same way"""
+        meta = {
+            "time_column": self.time_column
+        }
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = self._meta_path + ".tmp"
+        with open(temp_path, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(temp_path, self._meta_path)
+
+    def _as_bound(self, value, tz):
+        """Convert a query bound to a timestamp in the timezone of the stored times"""
+        bound = pd.Timestamp(value)
+        if tz is not None and bound.tzinfo is None:
+            bound = bound.tz_localize(tz)
+        elif tz is not None:
+            bound = bound.tz_convert(tz)
+        elif bound.tzinfo is not None:
+            bound = bound.tz_localize(None)
+        return bound
+
+    def _row_hashes(self, stored, incoming):
+        """Hash the rows of stored and incoming activity so identical records match regardless of dtype
+        return: hash series for stored and incoming
+        """
+        hashes = [pd.Series(0, index=df.index, dtype='uint64') for df in (stored, incoming)]
+        for column in incoming.columns:
+            pair = [stored[column], incoming[column]]
+            # A null elsewhere in the log turns an int column into float, so both sides
+            # of a column are brought to the same representation before hashing
+            numeric = all((is_numeric_dtype(s) and not is_bool_dtype(s)) or s.isna().all() for s in pair)
+            for i, s in enumerate(pair):
+                if numeric:
+                    s = pd.to_numeric(s).astype('float64')
+                else:
+                    s = s.astype(object).where(s.notna(), None).astype(str)
+                hashes[i] = (hashes[i] * 1000003) ^ pd.util.hash_pandas_object(s, index=False)
+        return hashes
+
+    def _drop_stored(self, activity, time_column):
+        """Drop incoming rows at the high-water mark that are already in the store"""
+        hwm = self._as_bound(self.high_water_mark, activity[time_column].dt.tz)
+        at_boundary = activity[time_column] == hwm
+        if not at_boundary.any():
+            return activity
+
+        stored = self.query(start=hwm, end=hwm + pd.Timedelta(1, 'ns'))
+        stored = stored.reindex(columns=activity.columns)
+        boundary = activity[at_boundary]
+        stored_hashes, hashes = self._row_hashes(stored, boundary)
+        stored_counts = stored_hashes.value_counts()
+
+        # Rows repeated within the same timestamp are kept once per copy not already stored
+        seen = hashes.groupby(hashes.values).cumcount()
+        already = hashes.map(stored_counts).fillna(0)
+        new_at_boundary = boundary.index[(seen >= already).values]
+        return activity[~at_boundary | activity.index.isin(new_at_boundary)]
+
+    def update(self):
+        """Pull the activity log and append only the records newer than the high-water mark
+        return: number of records added to the store
+        """
+        activity = self.account.get_account_activity(entity=self.entity, output='df')
+        if activity.empty:
+            return 0
+
+        time_column = self._resolve_time_column(activity)
+        # Logs spanning a DST change mix UTC offsets, so every time is stored in UTC
+        times = pd.to_datetime(activity[time_column], errors='coerce', utc=True)
+        keep = times.notna()
+        if self.high_water_mark is not None:
+            keep &= times >= self._as_bound(self.high_water_mark, times.dt.tz)
+        activity = activity[keep].assign(**{time_column: times[keep]})
+        if self.high_water_mark is not None:
+            activity = self._drop_stored(activity, time_column)
+        if activity.empty:
+            return 0
+
+        self._write_meta()
+
+        # Each poll adds its own file to every day it touches, existing files are never rewritten.
+        # Days are written in order and each file appears whole, so whatever an interrupted
+        # update left behind is exactly what the next one treats as stored
+        part_name = f"part-{datetime.now():%Y%m%d%H%M%S%f}.parquet"
+        days = activity[time_column].dt.strftime('%Y-%m-%d')
+        for day, records in activity.groupby(days, sort=True):
+            partition = os.path.join(self.path, f"date={day}")
+            os.makedirs(partition, exist_ok=True)
+            temp_path = os.path.join(partition, f".{part_name}.tmp")
+            records.to_parquet(temp_path, index=False)
+            os.replace(temp_path, os.path.join(partition, part_name))
+            self.high_water_mark = records[time_column].max()
+
+        return len(activity)
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        columns=None,
+        output='df'
+    ):
+        """Read stored activity from the local store
+        start : str or datetime
+            Include records at or after this time
+        end : str or datetime
+            Include records before this time
+        columns : list
+            Columns to read, the time column is always included
+        output : str
+            Output format, either df or dict
+        """
+        if self.time_column is None:
+            raise Exception("The activity store is empty, please run update() first.")
+
+        # Partitions are named by day in the stored timezone, so the bounds are converted
+        # to it before only the days in range are opened
+        tz = self.high_water_mark.tzinfo if self.high_water_mark is not None else None
+        if start is not None:
+            start = self._as_bound(start, tz)
+        if end is not None:
+            end = self._as_bound(end, tz)
+        files = []
+        for partition in sorted(glob.glob(os.path.join(self.path, "date=*"))):
+            day = os.path.basename(partition)[len("date="):]
+            if start is not None and day < start.strftime('%Y-%m-%d'):
+                continue
+            if end is not None and day > end.strftime('%Y-%m-%d'):
+                continue
+            files.extend(sorted(glob.glob(os.path.join(partition, "part-*.parquet"))))
+
+        if columns is not None and self.time_column not in columns:
+            columns = [self.time_column] + list(columns)
+
+        if files:
+            activity = pd.concat([pd.read_parquet(f, columns=columns) for f in files],
+                                 ignore_index=True)
+            times = activity[self.time_column]
+            keep = pd.Series(True, index=activity.index)
+            if start is not None:
+                keep &= times >= self._as_bound(start, times.dt.tz)
+            if end is not None:
+                keep &= times < self._as_bound(end, times.dt.tz)
+            activity = activity[keep].reset_index(drop=True)
+        else:
+            activity = pd.DataFrame(columns=columns)
+
+        if output == 'df':
+            return activity
+        elif output == 'dict':
+            return activity.to_dict(orient='records')
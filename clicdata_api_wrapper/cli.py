@@ -0,0 +1,297 @@
+from clicdata_api_wrapper.session import Session, SessionManager
+from clicdata_api_wrapper.data import Data
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pandas.api.types import is_datetime64_any_dtype, is_timedelta64_dtype
+import pandas as pd
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Class RateLimiter spaces out API calls shared by every worker thread
+
+    Class Methods:
+    wrap()
+        Returns the passed function throttled to the configured rate
+    """
+    def __init__(self, rate=None):
+        """
+        Parameters
+        rate : float
+            Maximum requests per second, no limit if not provided
+        """
+        self.interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_call = time.monotonic()
+
+    def wait(self):
+        """Block until the next call slot is available"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def wrap(self, func):
+        def throttled(*args, **kwargs):
+            self.wait()
+            return func(*args, **kwargs)
+        return throttled
+
+
+class Progress:
+    """
+    Class Progress prints a single updating progress line to stderr
+    """
+    def __init__(self, total=0, unit='datasets'):
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.rows = 0
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, done=0, rows=0):
+        with self._lock:
+            self.done += done
+            self.rows += rows
+            elapsed = time.monotonic() - self.start
+            rate = self.rows / elapsed if elapsed else 0
+            sys.stderr.write(f"\r{self.done}/{self.total} {self.unit}, {self.rows} rows, {rate:.0f} rows/s")
+            sys.stderr.flush()
+
+    def close(self):
+        sys.stderr.write("\n")
+
+
+def export_data(rec_ids, out_dir, file_format='csv', workers=4, progress=None):
+    """Export several data sets to one file each
+    rec_ids : list
+        RecIds of the data sets to export
+    out_dir : str
+        Directory the files are written to, named after the RecId
+    file_format : str
+        File format to write, either csv or parquet
+    workers : int
+        Number of data sets exported concurrently
+    return: list of dict with the timing of each data set
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    def export_one(rec_id):
+        start = time.monotonic()
+        path = os.path.join(out_dir, f"{rec_id}.{file_format}")
+        item = {"rec_id": rec_id, "file": path, "rows": 0}
+        try:
+            # A failed page raises rather than writing a truncated file
+            data = Data().retrieve_paginated_data(suffix=f"data/{rec_id}", raise_errors=True)
+            df = pd.DataFrame.from_dict(data)
+            if file_format == 'csv':
+                df.to_csv(path, index=False)
+            else:
+                df.to_parquet(path, index=False)
+            item.update({"rows": len(df), "status": "ok"})
+        except Exception as e:
+            item.update({"status": "error", "error": str(e)})
+        item["seconds"] = round(time.monotonic() - start, 3)
+        if progress is not None:
+            progress.update(done=1, rows=item["rows"])
+        return item
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(export_one, rec_ids))
+
+
+def import_data(files, rec_id=None, batch_size=10000, workers=4, progress=None):
+    """Import several files, appending each one to a new or an existing data set
+    files : list
+        csv or parquet files to import
+    rec_id : int
+        RecId of an existing data set to append every file to, otherwise
+        a data set named after each file is created
+    batch_size : int
+        Number of rows sent per append request
+    workers : int
+        Number of files read and batches sent concurrently
+    return: list of dict with the timing of each file
+    """
+    lock = threading.Lock()
+    items = [{"file": path, "rec_id": rec_id, "rows": 0, "busy_seconds": 0} for path in files]
+
+    def finish(item):
+        # Each file is timed from reading it to its own last batch, not to the end of the run.
+        # seconds includes time its batches spent queued behind other files, busy_seconds
+        # only the time spent reading, creating and appending it
+        item.setdefault("status", "ok")
+        item["seconds"] = round(time.monotonic() - item.pop("start"), 3)
+        item["busy_seconds"] = round(item["busy_seconds"], 3)
+        if progress is not None:
+            progress.update(done=1)
+
+    def prepare(item):
+        item["start"] = time.monotonic()
+        try:
+            return read_file(item)
+        finally:
+            with lock:
+                item["busy_seconds"] += time.monotonic() - item["start"]
+
+    def read_file(item):
+        path = item["file"]
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        if rec_id is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+            created = Data().create_data(name=name, cols=df.dtypes.to_dict())
+            try:
+                item["rec_id"] = int(created.text)
+            except ValueError:
+                raise Exception(f'Creating data set {name} returned:\n{created.text}')
+        # Datetimes are sent as ISO strings, timedeltas as text and missing values as
+        # null rather than NaN, none of Timestamp, Timedelta or NaN being valid json
+        for column in df.columns:
+            if is_datetime64_any_dtype(df[column]):
+                df[column] = df[column].map(lambda t: None if pd.isna(t) else t.isoformat())
+            elif is_timedelta64_dtype(df[column]):
+                df[column] = df[column].map(lambda t: None if pd.isna(t) else str(t))
+        return df.astype(object).where(df.notna(), None)
+
+    def append_batch(item, batch):
+        start = time.monotonic()
+        try:
+            Data().append_data(rec_id=item["rec_id"], data=batch, raise_errors=True)
+        finally:
+            with lock:
+                item["busy_seconds"] += time.monotonic() - start
+        if progress is not None:
+            progress.update(rows=len(batch))
+        return len(batch)
+
+    def batch_done(item, future):
+        with lock:
+            try:
+                item["rows"] += future.result()
+            except Exception as e:
+                item.update({"status": "error", "error": str(e)})
+            item["remaining"] -= 1
+            last = item["remaining"] == 0
+        if last:
+            del item["remaining"]
+            finish(item)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        prepared = {executor.submit(prepare, item): item for item in items}
+        for future in as_completed(prepared):
+            item = prepared[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                item.update({"status": "error", "error": str(e)})
+                finish(item)
+                continue
+            batches = [df.iloc[i:i + batch_size] for i in range(0, len(df), batch_size)]
+            if not batches:
+                finish(item)
+                continue
+            # Set before any batch is submitted so an early completion cannot finish the file
+            item["remaining"] = len(batches)
+            for batch in batches:
+                executor.submit(append_batch, item, batch).add_done_callback(
+                    lambda f, item=item: batch_done(item, f)
+                )
+
+    return items
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='clicdata',
+        description='Bulk export and import of ClicData data sets.'
+    )
+    parser.add_argument('--auth-method', default=os.environ.get('CLICDATA_AUTH_METHOD', 'client_credentials'),
+                        choices=['client_credentials', 'basic'])
+    parser.add_argument('--client-id', default=os.environ.get('CLICDATA_CLIENT_ID'))
+    parser.add_argument('--client-secret', default=os.environ.get('CLICDATA_CLIENT_SECRET'))
+    parser.add_argument('--username', default=os.environ.get('CLICDATA_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('CLICDATA_PASSWORD'))
+    parser.add_argument('--workers', type=int, default=4,
+                        help='number of concurrent workers (default: 4)')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='maximum API requests per second across all workers')
+    parser.add_argument('--report', default=None,
+                        help='write a json timing report to this path, or - for stdout')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='export data sets to files')
+    export_parser.add_argument('rec_ids', type=int, nargs='+', help='RecIds of the data sets to export')
+    export_parser.add_argument('--out-dir', default='.', help='directory to write files to')
+    export_parser.add_argument('--format', dest='file_format', default='csv', choices=['csv', 'parquet'])
+
+    import_parser = subparsers.add_parser('import', help='import files into data sets')
+    import_parser.add_argument('files', nargs='+', help='csv or parquet files to import')
+    import_parser.add_argument('--rec-id', type=int, default=None,
+                               help='append to this data set instead of creating one per file')
+    import_parser.add_argument('--batch-size', type=int, default=10000,
+                               help='rows sent per append request (default: 10000)')
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    session = Session(
+        auth_method=args.auth_method,
+        client_id=args.client_id,
+        client_secret=args.client_secret,
+        username=args.username,
+        password=args.password
+    )
+    session.api_call = RateLimiter(args.rate_limit).wrap(session.api_call)
+    SessionManager.bind_session(session)
+
+    started = datetime.now()
+    if args.command == 'export':
+        progress = Progress(total=len(args.rec_ids))
+        items = export_data(args.rec_ids, args.out_dir, file_format=args.file_format,
+                            workers=args.workers, progress=progress)
+    else:
+        progress = Progress(total=len(args.files), unit='files')
+        items = import_data(args.files, rec_id=args.rec_id, batch_size=args.batch_size,
+                            workers=args.workers, progress=progress)
+    progress.close()
+
+    elapsed = time.monotonic() - progress.start
+    rows = sum(item["rows"] for item in items)
+    report = {
+        "command": args.command,
+        "started": started.isoformat(),
+        "workers": args.workers,
+        "rate_limit": args.rate_limit,
+        "seconds": round(elapsed, 3),
+        "rows": rows,
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+        "items": items
+    }
+    if args.report == '-':
+        print(json.dumps(report, indent=2))
+    elif args.report is not None:
+        with open(args.report, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    failed = [item for item in items if item["status"] != "ok"]
+    for item in failed:
+        sys.stderr.write(f"Failed {item.get('rec_id') or item.get('file')}: {item['error']}\n")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
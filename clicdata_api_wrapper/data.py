@@ -1,4 +1,13 @@
 from clicdata_api_wrapper.session import Session, SessionManager
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_numeric_dtype,
+    is_string_dtype,
+    is_timedelta64_dtype
+)
+import numpy as np
 import pandas as pd
 
 
@@ -9,11 +18,20 @@ class Data:
             self.session = Session(**connection_params)
         else:
             self.session = SessionManager.get_session()
+        # Historical versions never change, so ones fetched with cache=True are kept for reuse
+        self._history_cache = {}
 
     def retrieve_paginated_data(
         self, 
-        suffix=None
+        suffix=None,
+        raise_errors=False
     ):
+        """Retrieve every page of data from an endpoint
+        suffix : str
+            Endpoint to page through
+        raise_errors : bool
+            Raise on a failed page instead of returning the data processed before it
+        """
         page = 1
         has_more_data = True
         data = []
@@ -22,9 +40,13 @@ class Data:
                                                   request_method='get',
                                                   params={"page": page})
             if page_response.status_code == 200:
-                has_more_data = page_response.json().get('has_more_data')
+                body = page_response.json()
+                has_more_data = body.get('has_more_data')
                 page += 1
-                data = data + page_response.json().get('data')
+                data.extend(body.get('data'))
+            elif raise_errors:
+                raise Exception(f"Ran into issues retrieving page {page} of {suffix}\n" +
+                                f"Status Code: {page_response.status_code}\nContent: {page_response.text}")
             else:
                 has_more_data = False
                 print(f"Ran into issues processing your request \nStatus Code: {page_response.status_code}\n" +
@@ -124,6 +146,194 @@ class Data:
                 elif output == 'dict':
                     return data
 
+    def _fetch_history_version(
+        self,
+        rec_id=None,
+        ver_id=None,
+        cache=False
+    ):
+        """Retrieve one data version, reusing it if already cached
+        rec_id : int
+            RecId of the data set you want to retrieve a version from
+        ver_id : int
+            Version ID of the data you want to retrieve
+        cache : bool
+            Whether to keep the retrieved version for later calls
+        """
+        if (rec_id, ver_id) in self._history_cache:
+            return self._history_cache[(rec_id, ver_id)]
+
+        # A failed page raises, so only complete versions are ever cached
+        data = self.retrieve_paginated_data(suffix=f"data/{rec_id}/v/{ver_id}", raise_errors=True)
+        df = pd.DataFrame.from_dict(data)
+        if cache:
+            self._history_cache[(rec_id, ver_id)] = df
+        return df
+
+    def _row_hashes(
+        self,
+        old=None,
+        new=None,
+        value_columns=None
+    ):
+        """Hash the rows of two versions so unchanged rows match regardless of dtype
+        old : pandas.Dataframe
+            Older version of the data
+        new : pandas.Dataframe
+            Newer version of the data
+        value_columns : list
+            Columns compared between the versions
+        return: uint64 arrays of row hashes for old and new
+        """
+        hashes = [np.zeros(len(old), dtype='uint64'), np.zeros(len(new), dtype='uint64')]
+        for column in value_columns:
+            pair = [df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+                    for df in (old, new)]
+            # A null turns an int column into float in one version only, so both sides
+            # of a column are brought to the same representation before hashing
+            numeric = all((is_numeric_dtype(s) and not is_bool_dtype(s)) or s.isna().all() for s in pair)
+            for i, s in enumerate(pair):
+                if numeric:
+                    s = pd.to_numeric(s).astype('float64')
+                else:
+                    s = s.astype(object).where(s.notna(), None).astype(str)
+                column_hash = pd.util.hash_pandas_object(s, index=False).values
+                hashes[i] = (hashes[i] * np.uint64(1000003)) ^ column_hash
+        return hashes
+
+    def _diff_versions(
+        self,
+        old=None,
+        new=None,
+        from_ver=None,
+        to_ver=None,
+        key_column=None,
+        chunk_size=100000
+    ):
+        """Yield the rows added, removed or changed from one version to the next"""
+        columns = list(new.columns) + [c for c in old.columns if c not in new.columns]
+        value_columns = [c for c in columns if c != key_column]
+        old_hash, new_hash = self._row_hashes(old=old, new=new, value_columns=value_columns)
+
+        # Join compact key/hash/position frames instead of the full versions
+        joined = pd.DataFrame({
+            key_column: old[key_column].values,
+            "_hash": old_hash,
+            "_row": range(len(old))
+        }).merge(
+            pd.DataFrame({
+                key_column: new[key_column].values,
+                "_hash": new_hash,
+                "_row": range(len(new))
+            }),
+            on=key_column,
+            how='outer',
+            suffixes=('_old', '_new'),
+            indicator=True
+        )
+        change = pd.Series(None, index=joined.index, dtype=object)
+        change[joined["_merge"] == 'right_only'] = 'added'
+        change[joined["_merge"] == 'left_only'] = 'removed'
+        change[(joined["_merge"] == 'both') & (joined["_hash_old"] != joined["_hash_new"])] = 'changed'
+        joined = joined.assign(change=change)[change.notna()]
+
+        for start in range(0, len(joined), chunk_size):
+            chunk = joined.iloc[start:start + chunk_size]
+            parts = []
+            for label, source, rows in [
+                ('added', new, "_row_new"),
+                ('changed', new, "_row_new"),
+                ('removed', old, "_row_old")
+            ]:
+                positions = chunk.loc[chunk["change"] == label, rows]
+                if len(positions):
+                    part = source.iloc[positions.astype(int).values].reindex(columns=columns)
+                    part.insert(0, "change", label)
+                    parts.append(part)
+            diff = pd.concat(parts, ignore_index=True)
+            diff.insert(1, "from_ver", from_ver)
+            diff.insert(2, "to_ver", to_ver)
+            yield diff
+
+    def diff_data_history(
+        self,
+        rec_id=None,
+        ver_ids=None,
+        key_column=None,
+        chunk_size=100000,
+        cache=False
+    ):
+        """Stream the rows added, removed or changed between consecutive data versions
+        Only the two versions being compared and the next one being retrieved are
+        held in memory, unless cache is set
+        rec_id : int
+            RecId of the data set you want to compare versions of
+        ver_ids : list
+            Version IDs to compare, in order, each one is diffed against the next
+        key_column : str
+            Column uniquely identifying a row in every version
+        chunk_size : int
+            Maximum number of diff rows yielded at once
+        cache : bool
+            Whether to keep every retrieved version for later calls, which holds
+            all of them in memory for the life of this Data object
+        return: generator of pandas.Dataframe with change, from_ver and to_ver columns
+            followed by the row, taken from the older version for removed rows
+        """
+        if type(rec_id) != int:
+            raise Exception('Please enter a valid data clone RecId as an integer.')
+        if ver_ids is None or len(ver_ids) < 2:
+            raise Exception('Please enter a list of at least two version IDs to compare.')
+        if key_column is None:
+            raise Exception('Please enter the key_column identifying rows across versions.')
+        if type(chunk_size) != int or chunk_size < 1:
+            raise Exception('Please enter a valid chunk_size as a positive integer.')
+
+        # Arguments are checked above on the call itself, the diff only runs as it is consumed
+        return self._iter_history_diff(
+            rec_id=rec_id,
+            ver_ids=list(ver_ids),
+            key_column=key_column,
+            chunk_size=chunk_size,
+            cache=cache
+        )
+
+    def _iter_history_diff(
+        self,
+        rec_id=None,
+        ver_ids=None,
+        key_column=None,
+        chunk_size=100000,
+        cache=False
+    ):
+        """Generator behind diff_data_history, holding at most three versions at a time"""
+        def fetch(ver_id):
+            df = self._fetch_history_version(rec_id=rec_id, ver_id=ver_id, cache=cache)
+            if key_column not in df.columns:
+                raise Exception(f'Column [{key_column}] is missing from version {ver_id}.')
+            if not df[key_column].is_unique:
+                raise Exception(f'Column [{key_column}] does not uniquely identify rows in version {ver_id}.')
+            return df
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            old_future = executor.submit(fetch, ver_ids[0])
+            new_future = executor.submit(fetch, ver_ids[1])
+            old = old_future.result()
+            for i, (from_ver, to_ver) in enumerate(zip(ver_ids, ver_ids[1:])):
+                new = new_future.result()
+                # The following version is retrieved while this pair is being diffed
+                if i + 2 < len(ver_ids):
+                    new_future = executor.submit(fetch, ver_ids[i + 2])
+                yield from self._diff_versions(
+                    old=old,
+                    new=new,
+                    from_ver=from_ver,
+                    to_ver=to_ver,
+                    key_column=key_column,
+                    chunk_size=chunk_size
+                )
+                old = new
+
     def create_data(
         self, 
         name=None, 
@@ -152,6 +362,8 @@ class Data:
         # Dictionary containing Pandas data types and the converted type for ClicData
         pandas_convert = {
             'object': 'text',
+            'str': 'text',
+            'string': 'text',
             'int64': 'number',
             'float64': 'number',
             'bool': 'checkbox',
@@ -170,7 +382,21 @@ class Data:
             suffix = "data"
             columns = []
             for column_name in cols.keys():
-                data_type = pandas_convert[cols[column_name].name]
+                dtype = cols[column_name]
+                data_type = pandas_convert.get(dtype.name)
+                # Sized, nullable and timezone variants such as int32, Int64, boolean or
+                # datetime64[us, UTC] are mapped by kind
+                if data_type is None:
+                    if is_bool_dtype(dtype):
+                        data_type = 'checkbox'
+                    elif is_datetime64_any_dtype(dtype):
+                        data_type = 'datetime'
+                    elif is_numeric_dtype(dtype):
+                        data_type = 'number'
+                    elif is_string_dtype(dtype) or is_timedelta64_dtype(dtype):
+                        data_type = 'text'
+                    else:
+                        data_type = dtype.name
                 if data_type not in valid_data_types:
                     raise Exception(f'Column [{column_name}] contains an invalid data type ({data_type})' +
                                     f', please enter your data with one of the following: {valid_data_types}.')
@@ -195,13 +421,16 @@ class Data:
     def append_data(
         self, 
         rec_id=None, 
-        data=None
+        data=None,
+        raise_errors=False
     ):
         """Append your data to an existing data set
         rec_id : int
             rec_id of your data in ClicData
         data : pandas.Dataframe
             df containing the data you want to append
+        raise_errors : bool
+            Raise when ClicData does not accept the rows instead of returning the response text
         """
         if type(rec_id) != int:
             raise Exception('Please enter a valid data clone RecId.')
@@ -226,6 +455,9 @@ class Data:
                 body=body,
                 request_method='post'
             )
+            if raise_errors and not 200 <= post.status_code < 300:
+                raise Exception(f"Ran into issues appending to {rec_id}\n" +
+                                f"Status Code: {post.status_code}\nContent: {post.text}")
 
             return post.text
 
@@ -306,12 +538,12 @@ class Data:
         multiple_rows='all'
     ):
         """ Deletes rows from a specified data set.
-        name : str
-            Name of data set to create, must be unique to your account
-        desc : str
-            Optional, long-form details about your data
-        data : pandas.Dataframe
-            Data to upload
+        rec_id : int
+            rec_id of your data in ClicData
+        filters : dict
+            Column names as keys and values as values specifying which rows to delete
+        multiple_rows : str
+            Delete 'all' matching rows or only the 'first' one
         """
         if type(rec_id) != int:
             raise Exception('Please enter a valid data clone RecId as an integer.')
@@ -320,7 +552,7 @@ class Data:
         else:
             suffix = f"data/{rec_id}/row"
             find = []
-            for k, v in filters.items:
+            for k, v in filters.items():
                 cell = {"column": k,
                         "value": v}
                 find.append(cell)
@@ -337,3 +569,101 @@ class Data:
             )
 
             return delete.text
+
+    def bulk_delete_data(
+        self,
+        rec_id=None,
+        keys=None,
+        key_column=None,
+        multiple_rows='all',
+        batch_size=500,
+        max_workers=4,
+        output='df'
+    ):
+        """ Deletes every row matching a set of key values from a specified data set.
+        rec_id : int
+            rec_id of your data in ClicData
+        keys : pandas.Dataframe or array-like
+            Key values to delete, a df matches on all of its columns
+        key_column : str
+            Column name to match on, required when keys is not a df
+        multiple_rows : str
+            Delete 'all' matching rows or only the 'first' one
+        batch_size : int
+            Number of keys handled by each worker batch
+        max_workers : int
+            Number of batches sent concurrently
+        output : str
+            Output format of the per-batch status, either df or dict
+        """
+        if type(rec_id) != int:
+            raise Exception('Please enter a valid data clone RecId as an integer.')
+        if keys is None:
+            raise Exception('Please enter a df or an array of key values to delete.')
+        if type(batch_size) != int or batch_size < 1:
+            raise Exception('Please enter a valid batch_size as a positive integer.')
+
+        if not isinstance(keys, pd.DataFrame):
+            if key_column is None:
+                raise Exception('Please enter the key_column your key values belong to.')
+            keys = pd.DataFrame({key_column: pd.Series(keys)})
+
+        # Build every find payload in one pass over an object array, which also
+        # casts numpy scalars to native Python types the json encoder accepts
+        keys = keys.drop_duplicates()
+        columns = list(keys.columns)
+        # Datetimes are sent as ISO strings, Timestamp not being valid json
+        for column in columns:
+            if is_datetime64_any_dtype(keys[column]):
+                keys[column] = keys[column].map(lambda t: None if pd.isna(t) else t.isoformat())
+        values = keys.astype(object).where(keys.notna(), None).to_numpy()
+        bodies = [
+            {
+                "multiplerows": multiple_rows,
+                "find": [{"column": c, "value": v} for c, v in zip(columns, row)]
+            }
+            for row in values
+        ]
+
+        # The row endpoint only accepts one find per request, so each batch is
+        # a group of requests handled by a single worker
+        suffix = f"data/{rec_id}/row"
+        batches = [bodies[i:i + batch_size] for i in range(0, len(bodies), batch_size)]
+
+        def send_batch(batch_number):
+            batch = batches[batch_number]
+            failed = []
+            for body in batch:
+                try:
+                    delete = self.session.api_call(
+                        request_method='delete',
+                        suffix=suffix,
+                        body=body
+                    )
+                except Exception as e:
+                    failed.append({"find": body["find"],
+                                   "status_code": None,
+                                   "content": str(e)})
+                    continue
+                if delete.status_code != 200:
+                    failed.append({"find": body["find"],
+                                   "status_code": delete.status_code,
+                                   "content": delete.text})
+            status = {
+                "batch": batch_number,
+                "keys": len(batch),
+                "deleted": len(batch) - len(failed),
+                "failed": len(failed),
+                "errors": failed
+            }
+            print(f"Batch {batch_number + 1}/{len(batches)}: " +
+                  f"{status['deleted']} of {status['keys']} keys deleted")
+            return status
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = list(executor.map(send_batch, range(len(batches))))
+
+        if output == 'df':
+            return pd.DataFrame.from_dict(statuses)
+        elif output == 'dict':
+            return statuses
@@ -27,6 +27,12 @@ def main():
             'pandas', 
             'requests'
         ],
+        extras_require={
+            'store': ['pyarrow']
+        },
+        entry_points={
+            'console_scripts': ['clicdata=clicdata_api_wrapper.cli:main']
+        },
         include_package_data=True,
         license='MIT'
     )